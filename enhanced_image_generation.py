@@ -7,14 +7,116 @@ version: 0.1.5
 licence: MIT
 """
 
-import json
+import asyncio
+import os
+import stat
 import traceback
-from pathlib import Path
-import base64
+import binascii
 from typing import Optional, List, Dict, Any, Literal
 import logging
 from pydantic import BaseModel, Field
 
+# Módulos de OpenWebUI importados una sola vez; el error se conserva para reportarlo al llamar
+try:
+    from open_webui.routers.images import image_generations, GenerateImageForm
+
+    _IMAGES_IMPORT_ERROR: Optional[Exception] = None
+except ImportError as e:
+    image_generations = None
+    GenerateImageForm = None
+    _IMAGES_IMPORT_ERROR = e
+
+try:
+    from open_webui.models.users import Users
+
+    _USERS_IMPORT_ERROR: Optional[Exception] = None
+except Exception as e:
+    Users = None
+    _USERS_IMPORT_ERROR = e
+
+# Tamaño de lectura múltiplo de 3 para que cada bloque codifique sin padding intermedio
+_B64_READ_SIZE = 57 * 1024
+
+# MIME type por extensión de archivo
+_MIME_MAP = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".gif": "image/gif",
+    ".bmp": "image/bmp",
+    ".tiff": "image/tiff",
+    ".png": "image/png",
+}
+
+# Orden de métodos de emisión según EMIT_METHOD_PRIORITY
+_EMIT_ORDER = {
+    "direct": ("direct", "markdown", "html"),
+    "markdown": ("markdown", "direct", "html"),
+    "html": ("html", "direct", "markdown"),
+    "auto": ("direct", "markdown", "html"),
+}
+
+
+def _regular_file_stat(p: str) -> Optional[os.stat_result]:
+    """Devuelve el stat del path si es un archivo regular, o None (una sola syscall)"""
+    try:
+        # os.stat sigue symlinks, igual que Path.exists()/is_file()
+        st = os.stat(p)
+    except (OSError, ValueError):
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
+
+
+def _sync_read_and_b64(path: str) -> str:
+    """Lee un archivo y lo codifica en base64 por bloques (bloqueante, para el executor)"""
+    out = bytearray()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_B64_READ_SIZE)
+            if not chunk:
+                break
+            out += binascii.b2a_base64(chunk, newline=False)
+    return out.decode("ascii")
+
+
+def _markdown_image(url_or_datauri: str, alt: str) -> str:
+    """Contenido markdown para una imagen"""
+    return f"![{alt}]({url_or_datauri})"
+
+
+def _html_image(
+    url_or_datauri: str, w: Optional[int], h: Optional[int], alt: str
+) -> str:
+    """Contenido HTML para una imagen"""
+    return f'<img src="{url_or_datauri}" alt="{alt}" style="max-width: {w or 512}px; max-height: {h or 512}px; border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">'
+
+
+async def _noop_async(*args, **kwargs) -> None:
+    """Emisor vacío usado cuando no hay nada que emitir"""
+    return None
+
+
+async def _noop_async_false(*args, **kwargs) -> bool:
+    """Emisor vacío de imágenes: siempre indica que no se emitió"""
+    return False
+
+
+def _configure_logger() -> logging.Logger:
+    """Configura una única vez el logger específico de esta tool"""
+    logger = logging.getLogger("image_gen_tool")
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        formatter = logging.Formatter(
+            "[%(asctime)s] [IMAGE_GEN] [%(levelname)s] %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return logger
+
+
+_LOGGER = _configure_logger()
+
 
 class Tools:
     class Valves(BaseModel):
@@ -40,6 +142,10 @@ class Tools:
             default="png,jpg,jpeg,webp,gif,bmp,tiff",
             description="Formatos de imagen soportados (separados por comas)",
         )
+        BATCH_EMIT: bool = Field(
+            default=True,
+            description="Con prioridad markdown/html, emite todas las imágenes en un único mensaje",
+        )
 
     class UserValves(BaseModel):
         """Configuración por usuario - Cada usuario puede cambiar esto"""
@@ -58,46 +164,67 @@ class Tools:
         # Inicializar valves
         self.valves = self.Valves()
 
-        # Configurar logger específico para esta tool
-        self.logger = logging.getLogger("image_gen_tool")
-        if not self.logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter(
-                "[%(asctime)s] [IMAGE_GEN] [%(levelname)s] %(message)s",
-                datefmt="%Y-%m-%d %H:%M:%S",
-            )
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
+        # Logger específico para esta tool (configurado una sola vez a nivel de módulo)
+        self.logger = _LOGGER
+
+        # Caches derivadas de valves (se recalculan solo si cambia la valve)
+        self._supported_exts_cache: frozenset = frozenset()
+        self._supported_exts_src: Optional[str] = None
+        self._max_size_bytes_cache: int = 0
+        self._max_size_mb_src: Optional[int] = None
 
         self._update_log_level()
         pass
 
+    def _get_supported_exts(self) -> frozenset:
+        """Devuelve las extensiones soportadas, recalculando solo si cambió la valve"""
+        src = self.valves.SUPPORTED_FORMATS
+        if src != self._supported_exts_src:
+            self._supported_exts_cache = frozenset(
+                "." + e.strip().lower() for e in src.split(",")
+            )
+            self._supported_exts_src = src
+        return self._supported_exts_cache
+
+    def _get_max_size_bytes(self) -> int:
+        """Devuelve el tamaño máximo en bytes, recalculando solo si cambió la valve"""
+        src = self.valves.MAX_FILE_SIZE_MB
+        if src != self._max_size_mb_src:
+            self._max_size_bytes_cache = src * 1024 * 1024
+            self._max_size_mb_src = src
+        return self._max_size_bytes_cache
+
     def _update_log_level(self):
         """Actualiza el nivel de logging según las valves"""
-        if self.valves.VERBOSE_LOGGING:
+        # Cachear flags para comprobaciones rápidas en los helpers de logging
+        self._debug = self.valves.DEBUG_ENABLED
+        self._verbose = self.valves.VERBOSE_LOGGING
+        if self._verbose:
             self.logger.setLevel(logging.DEBUG)
-        elif self.valves.DEBUG_ENABLED:
+        elif self._debug:
             self.logger.setLevel(logging.INFO)
         else:
             self.logger.setLevel(logging.WARNING)
 
-    def _log_debug(self, message: str):
-        """Log debug con control de verbosidad"""
-        if self.valves.VERBOSE_LOGGING:
-            self.logger.debug(message)
+    def _log_debug(self, message: str, *args):
+        """Log debug con control de verbosidad (args con formato perezoso %s)"""
+        if not self._verbose:
+            return
+        self.logger.debug(message, *args)
 
-    def _log_info(self, message: str):
-        """Log info con control de debug"""
-        if self.valves.DEBUG_ENABLED:
-            self.logger.info(message)
+    def _log_info(self, message: str, *args):
+        """Log info con control de debug (args con formato perezoso %s)"""
+        if not self._debug:
+            return
+        self.logger.info(message, *args)
 
-    def _log_warning(self, message: str):
+    def _log_warning(self, message: str, *args):
         """Log warning siempre activo"""
-        self.logger.warning(message)
+        self.logger.warning(message, *args)
 
-    def _log_error(self, message: str):
+    def _log_error(self, message: str, *args):
         """Log error siempre activo"""
-        self.logger.error(message)
+        self.logger.error(message, *args)
 
     async def generate_image(
         self,
@@ -116,6 +243,11 @@ class Tools:
         # Actualizar nivel de logging al inicio de cada ejecución
         self._update_log_level()
 
+        # Flags como locales (ya cacheados por _update_log_level) para el bucle por imagen
+        _debug = self._debug
+        _verbose = self._verbose
+        _emit_priority = self.valves.EMIT_METHOD_PRIORITY
+
         # Obtener UserValves del usuario (robusto: acepta dicts o objetos con distintas convenciones)
         user_valves = None
         if __user__ and "valves" in __user__:
@@ -135,12 +267,13 @@ class Tools:
                 for k in candidates:
                     if hasattr(uvalves, k):
                         return getattr(uvalves, k)
-                # chequeo por nombre insensible a mayúsculas/minúsculas en atributos del objeto
-                attrs = {a.lower(): a for a in dir(uvalves)}
-                for k in candidates:
-                    ak = attrs.get(k.lower())
-                    if ak:
-                        return getattr(uvalves, ak)
+                # último recurso: nombre insensible a mayúsculas solo sobre campos pydantic
+                fields = getattr(type(uvalves), "model_fields", None)
+                if fields:
+                    wanted = {k.lower() for k in candidates}
+                    for name in fields:
+                        if name.lower() in wanted:
+                            return getattr(uvalves, name)
             except Exception:
                 pass
             return default
@@ -159,14 +292,14 @@ class Tools:
 
         self._log_info(f"=== INICIANDO GENERACIÓN DE IMAGEN ===")
         self._log_info(
-            f"Configuración Valves - Debug: {self.valves.DEBUG_ENABLED}, Verbose: {self.valves.VERBOSE_LOGGING}"
+            f"Configuración Valves - Debug: {_debug}, Verbose: {_verbose}"
         )
         self._log_info(
             f"Configuración Usuario - Status: {show_status}, Alt Text: {auto_alt_text}"
         )
         self._log_info(f"Prompt: {prompt[:100]}{'...' if len(prompt) > 100 else ''}")
         self._log_info(f"Dimensiones: {width}x{height}, Steps: {steps}")
-        self._log_debug(f"Método emisión: {self.valves.EMIT_METHOD_PRIORITY}")
+        self._log_debug(f"Método emisión: {_emit_priority}")
         self._log_debug(f"Formatos soportados: {self.valves.SUPPORTED_FORMATS}")
         self._log_debug(f"Tamaño máximo archivo: {self.valves.MAX_FILE_SIZE_MB}MB")
 
@@ -174,40 +307,31 @@ class Tools:
             if b64.startswith("data:"):
                 self._log_debug("B64 ya tiene formato data URI")
                 return b64
-            result = f"data:{mime};base64,{b64}"
-            self._log_debug(f"Convertido b64 a data URI: {mime}, longitud: {len(b64)}")
-            return result
+            if _verbose:
+                self._log_debug(
+                    f"Convertido b64 a data URI: {mime}, longitud: {len(b64)}"
+                )
+            return "".join(("data:", mime, ";base64,", b64))
 
-        def _path_to_data_uri(path: str, mime: str = "image/png") -> str:
-            """Convierte un path local en data URI base64."""
+        async def _path_to_data_uri_from_stat(path: str, st: os.stat_result) -> str:
+            """Convierte un path local ya validado (con su stat) en data URI base64."""
             self._log_debug(f"Convirtiendo path a data URI: {path}")
             try:
-                p = Path(path)
-                if not p.exists():
-                    self._log_warning(f"Archivo no encontrado: {path}")
-                    return ""
+                suffix = os.path.splitext(path)[1].lower()
 
-                if not p.is_file():
-                    self._log_warning(f"Path no es un archivo válido: {path}")
-                    return ""
-
-                # Verificar tamaño de archivo
-                file_size = p.stat().st_size
-                max_size_bytes = self.valves.MAX_FILE_SIZE_MB * 1024 * 1024
-                if file_size > max_size_bytes:
+                # Verificar tamaño de archivo (reutiliza el stat del llamador)
+                file_size = st.st_size
+                if file_size > self._get_max_size_bytes():
                     self._log_error(
                         f"Archivo muy grande: {file_size/1024/1024:.2f}MB > {self.valves.MAX_FILE_SIZE_MB}MB"
                     )
                     return ""
 
                 # Verificar extensión según configuración
-                supported_exts = [
-                    f".{ext.strip().lower()}"
-                    for ext in self.valves.SUPPORTED_FORMATS.split(",")
-                ]
-                if not p.suffix.lower() in supported_exts:
+                supported_exts = self._get_supported_exts()
+                if suffix not in supported_exts:
                     self._log_warning(
-                        f"Extensión no soportada: {p.suffix}. Soportadas: {supported_exts}"
+                        f"Extensión no soportada: {suffix}. Soportadas: {sorted(supported_exts)}"
                     )
                     return ""
 
@@ -215,20 +339,13 @@ class Tools:
                     f"Leyendo archivo válido: {path} ({file_size/1024:.1f}KB)"
                 )
 
-                with open(p, "rb") as f:
-                    b64 = base64.b64encode(f.read()).decode("utf-8")
+                # Leer y codificar fuera del event loop para no bloquear otras peticiones
+                b64 = await asyncio.get_running_loop().run_in_executor(
+                    None, _sync_read_and_b64, path
+                )
 
                 # Detectar MIME type correcto
-                mime_map = {
-                    ".jpg": "image/jpeg",
-                    ".jpeg": "image/jpeg",
-                    ".webp": "image/webp",
-                    ".gif": "image/gif",
-                    ".bmp": "image/bmp",
-                    ".tiff": "image/tiff",
-                    ".png": "image/png",
-                }
-                detected_mime = mime_map.get(p.suffix.lower(), "image/png")
+                detected_mime = _MIME_MAP.get(suffix, "image/png")
 
                 result = f"data:{detected_mime};base64,{b64}"
                 self._log_info(
@@ -238,27 +355,23 @@ class Tools:
 
             except Exception as e:
                 self._log_error(f"Error convirtiendo path a data URI: {e}")
-                if self.valves.VERBOSE_LOGGING:
+                if _verbose:
                     self._log_error(f"Traceback: {traceback.format_exc()}")
                 return ""
 
         async def _emit_status(description: str, done: bool = False):
             """Helper para emitir status con logging"""
-            if not show_status:
-                return
-
             try:
-                if __event_emitter__:
-                    await __event_emitter__(
-                        {
-                            "type": "status",
-                            "data": {
-                                "description": description,
-                                "done": done,
-                            },
-                        }
-                    )
-                    self._log_debug(f"Status emitido: {description} (done: {done})")
+                await __event_emitter__(
+                    {
+                        "type": "status",
+                        "data": {
+                            "description": description,
+                            "done": done,
+                        },
+                    }
+                )
+                self._log_debug(f"Status emitido: {description} (done: {done})")
             except Exception as e:
                 self._log_error(f"Error emitiendo status '{description}': {e}")
 
@@ -267,18 +380,17 @@ class Tools:
         ):
             """Método directo de emisión"""
             try:
-                if __event_emitter__:
-                    data = {"url": url_or_datauri}
-                    if w and w > 0:
-                        data["width"] = w
-                    if h and h > 0:
-                        data["height"] = h
-                    if alt:
-                        data["alt"] = alt
-
-                    await __event_emitter__({"type": "image", "data": data})
-                    self._log_info("✓ Imagen emitida con método DIRECTO")
-                    return True
+                data = {"url": url_or_datauri}
+                if w and w > 0:
+                    data["width"] = w
+                if h and h > 0:
+                    data["height"] = h
+                if alt:
+                    data["alt"] = alt
+
+                await __event_emitter__({"type": "image", "data": data})
+                self._log_info("✓ Imagen emitida con método DIRECTO")
+                return True
             except Exception as e:
                 self._log_warning(f"Falló método directo: {e}")
             return False
@@ -286,16 +398,15 @@ class Tools:
         async def _emit_image_markdown(url_or_datauri: str, alt: str):
             """Método markdown de emisión"""
             try:
-                if __event_emitter__:
-                    markdown_content = f"![{alt}]({url_or_datauri})"
-                    await __event_emitter__(
-                        {
-                            "type": "message",
-                            "data": {"content": markdown_content},
-                        }
-                    )
-                    self._log_info("✓ Imagen emitida con método MARKDOWN")
-                    return True
+                markdown_content = _markdown_image(url_or_datauri, alt)
+                await __event_emitter__(
+                    {
+                        "type": "message",
+                        "data": {"content": markdown_content},
+                    }
+                )
+                self._log_info("✓ Imagen emitida con método MARKDOWN")
+                return True
             except Exception as e:
                 self._log_warning(f"Falló método markdown: {e}")
             return False
@@ -305,17 +416,42 @@ class Tools:
         ):
             """Método HTML de emisión"""
             try:
-                if __event_emitter__:
-                    html_content = f'<img src="{url_or_datauri}" alt="{alt}" style="max-width: {w or 512}px; max-height: {h or 512}px; border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">'
-                    await __event_emitter__(
-                        {"type": "message", "data": {"content": html_content}}
-                    )
-                    self._log_info("✓ Imagen emitida con método HTML")
-                    return True
+                html_content = _html_image(url_or_datauri, w, h, alt)
+                await __event_emitter__(
+                    {"type": "message", "data": {"content": html_content}}
+                )
+                self._log_info("✓ Imagen emitida con método HTML")
+                return True
             except Exception as e:
                 self._log_warning(f"Falló método HTML: {e}")
             return False
 
+        async def _emit_images_batch(
+            urls: List[str], w: Optional[int], h: Optional[int]
+        ) -> bool:
+            """Emite todas las imágenes en un único mensaje markdown/html"""
+            if _emit_priority == "markdown":
+                content = "\n\n".join(
+                    _markdown_image(u, f"imagen_generada_{i}")
+                    for i, u in enumerate(urls, 1)
+                )
+            else:
+                content = "\n".join(
+                    _html_image(u, w, h, f"imagen_generada_{i}")
+                    for i, u in enumerate(urls, 1)
+                )
+            try:
+                await __event_emitter__(
+                    {"type": "message", "data": {"content": content}}
+                )
+                self._log_info(
+                    f"✓ {len(urls)} imágenes emitidas en lote ({_emit_priority.upper()})"
+                )
+                return True
+            except Exception as e:
+                self._log_warning(f"Falló emisión en lote, se emite por imagen: {e}")
+            return False
+
         async def _emit_image(
             url_or_datauri: str,
             w: Optional[int] = None,
@@ -333,44 +469,41 @@ class Tools:
                 alt = f"Imagen generada: {prompt[:50]}{'...' if len(prompt) > 50 else ''} - #{index}"
 
             self._log_info(f"Emitiendo imagen #{index}: {alt}")
-            self._log_debug(f"URL length: {len(url_or_datauri)}, Dimensiones: {w}x{h}")
-            self._log_debug(f"Método configurado: {self.valves.EMIT_METHOD_PRIORITY}")
-
-            # Determinar orden de métodos según configuración
-            if self.valves.EMIT_METHOD_PRIORITY == "direct":
-                methods = [
-                    ("directo", lambda: _emit_image_direct(url_or_datauri, w, h, alt)),
-                    ("markdown", lambda: _emit_image_markdown(url_or_datauri, alt)),
-                    ("html", lambda: _emit_image_html(url_or_datauri, w, h, alt)),
-                ]
-            elif self.valves.EMIT_METHOD_PRIORITY == "markdown":
-                methods = [
-                    ("markdown", lambda: _emit_image_markdown(url_or_datauri, alt)),
-                    ("directo", lambda: _emit_image_direct(url_or_datauri, w, h, alt)),
-                    ("html", lambda: _emit_image_html(url_or_datauri, w, h, alt)),
-                ]
-            elif self.valves.EMIT_METHOD_PRIORITY == "html":
-                methods = [
-                    ("html", lambda: _emit_image_html(url_or_datauri, w, h, alt)),
-                    ("directo", lambda: _emit_image_direct(url_or_datauri, w, h, alt)),
-                    ("markdown", lambda: _emit_image_markdown(url_or_datauri, alt)),
-                ]
-            else:  # auto (por defecto)
-                methods = [
-                    ("directo", lambda: _emit_image_direct(url_or_datauri, w, h, alt)),
-                    ("markdown", lambda: _emit_image_markdown(url_or_datauri, alt)),
-                    ("html", lambda: _emit_image_html(url_or_datauri, w, h, alt)),
-                ]
+            if _verbose:
+                self._log_debug(
+                    f"URL length: {len(url_or_datauri)}, Dimensiones: {w}x{h}"
+                )
+                self._log_debug(f"Método configurado: {_emit_priority}")
+
+            # Determinar orden de métodos según configuración (auto por defecto)
+            order = _EMIT_ORDER.get(_emit_priority, _EMIT_ORDER["auto"])
 
             # Intentar métodos en orden
-            for method_name, method_func in methods:
+            for method_name in order:
                 self._log_debug(f"Intentando método: {method_name}")
-                if await method_func():
+                if method_name == "direct":
+                    ok = await _emit_image_direct(url_or_datauri, w, h, alt)
+                elif method_name == "markdown":
+                    ok = await _emit_image_markdown(url_or_datauri, alt)
+                else:
+                    ok = await _emit_image_html(url_or_datauri, w, h, alt)
+                if ok:
                     return True
 
             self._log_error("✗ Todos los métodos de emisión fallaron")
             return False
 
+        # Sin emitter o sin status: enlazar no-ops una sola vez
+        if __event_emitter__ is None:
+            self._log_info(
+                "Sin __event_emitter__: se omite la emisión de status e imágenes"
+            )
+            _emit_status = _noop_async
+            _emit_image = _noop_async_false
+            _emit_images_batch = _noop_async_false
+        elif not show_status:
+            _emit_status = _noop_async
+
         # Emit status inicial
         await _emit_status("Inicializando generación de imagen...")
 
@@ -404,20 +537,14 @@ class Tools:
             self._log_info(
                 f"Payload construido (formato híbrido): size={payload['size']}, width={width}, height={height}, steps={steps}"
             )
-            self._log_debug(f"Payload completo: {payload}")
-            internal_err = None
+            self._log_debug("Payload completo: %s", payload)
 
-            # Importaciones con logging
-            self._log_debug("Importando módulos de OpenWebUI...")
-            from open_webui.routers.images import image_generations, GenerateImageForm
-
-            try:
-                from open_webui.models.users import Users
-
-                self._log_debug("Módulo Users importado exitosamente")
-            except Exception as e:
-                Users = None
-                self._log_warning(f"No se pudo importar Users: {e}")
+            # Módulos de OpenWebUI (importados a nivel de módulo)
+            if image_generations is None:
+                # Excepción nueva en cada llamada: re-lanzar la del módulo acumularía frames
+                raise ImportError(str(_IMAGES_IMPORT_ERROR)) from _IMAGES_IMPORT_ERROR
+            if Users is None:
+                self._log_warning(f"No se pudo importar Users: {_USERS_IMPORT_ERROR}")
 
             # Preparar formulario
             try:
@@ -450,9 +577,9 @@ class Tools:
 
             # Log detallado de la respuesta
             self._log_info(f"📋 Respuesta recibida - Tipo: {type(images)}")
-            if self.valves.VERBOSE_LOGGING:
-                self._log_debug(f"📄 Respuesta completa: {images}")
-            else:
+            if _verbose:
+                self._log_debug("📄 Respuesta completa: %s", images)
+            elif _debug:
                 # Log resumido para debug normal
                 if isinstance(images, list):
                     self._log_info(f"📝 Lista con {len(images)} elementos")
@@ -461,11 +588,16 @@ class Tools:
                         f"📘 Dict con claves: {list(images.keys()) if images else 'Vacío'}"
                     )
                 else:
-                    self._log_info(f"📄 Valor: {str(images)[:200]}...")
+                    self._log_info("📄 Valor: %.200s...", images)
 
             # ===== PROCESAMIENTO DE RESPUESTA =====
             images_out: List[str] = []
 
+            # Paths locales ya convertidos en esta respuesta, para no releer/recodificar
+            # duplicados. También guarda "" de conversiones fallidas (a propósito: el
+            # mismo archivo volvería a fallar y así no se repite lectura ni log)
+            seen_paths: Dict[str, str] = {}
+
             # Normalizar respuesta
             if images is None:
                 raw_items = []
@@ -479,15 +611,15 @@ class Tools:
 
             for idx, it in enumerate(raw_items):
                 self._log_info(f"--- 🖼️ Elemento {idx + 1}/{len(raw_items)} ---")
-                self._log_debug(f"Tipo: {type(it)}")
 
-                if self.valves.VERBOSE_LOGGING:
-                    self._log_debug(f"Contenido completo: {it}")
+                self._log_debug("Tipo: %s", type(it))
+                self._log_debug("Contenido completo: %s", it)
 
                 processed_url = None
 
                 if isinstance(it, dict):
-                    self._log_debug(f"Dict con claves: {list(it.keys())}")
+                    if _verbose:
+                        self._log_debug("Dict con claves: %s", list(it.keys()))
 
                     # Buscar en campos prioritarios
                     priority_fields = [
@@ -506,18 +638,29 @@ class Tools:
                         if field in it and it[field]:
                             value = it[field]
                             self._log_debug(
-                                f"Procesando campo '{field}': {str(value)[:100]}..."
+                                "Procesando campo '%s': %.100s...", field, value
                             )
 
                             if field == "url" or field in ["file_path", "path"]:
                                 # Tratar como URL o path
                                 try:
-                                    path_obj = Path(value)
-                                    if path_obj.exists() and path_obj.is_file():
+                                    if value in seen_paths:
+                                        self._log_info(
+                                            f"♻️ Campo '{field}' ya procesado, reutilizando"
+                                        )
+                                        processed_url = seen_paths[value]
+                                        break
+                                    st = _regular_file_stat(value)
+                                    if st is not None:
                                         self._log_info(
                                             f"🔄 Campo '{field}' es path local"
                                         )
-                                        processed_url = _path_to_data_uri(value)
+                                        processed_url = (
+                                            await _path_to_data_uri_from_stat(
+                                                value, st
+                                            )
+                                        )
+                                        seen_paths[value] = processed_url
                                     else:
                                         self._log_info(
                                             f"🌐 Campo '{field}' es URL externa"
@@ -541,18 +684,25 @@ class Tools:
                                 processed_url = value
                                 break
 
-                    if not processed_url:
-                        self._log_warning(f"❌ No se encontró imagen válida en dict")
-                        processed_url = json.dumps(it)
+                    if processed_url is None:
+                        # Ningún campo reconocible: nada que emitir, pasar al siguiente.
+                        # Si un campo coincidió pero la conversión falló (""), se reporta abajo
+                        self._log_warning(
+                            f"❌ No se encontró imagen válida en dict (elemento {idx + 1})"
+                        )
+                        continue
 
                 elif isinstance(it, str):
-                    self._log_info(f"🔤 Procesando string: {it[:100]}...")
+                    self._log_info("🔤 Procesando string: %.100s...", it)
 
                     try:
-                        path_obj = Path(it)
-                        if path_obj.exists() and path_obj.is_file():
+                        if it in seen_paths:
+                            self._log_info("♻️ Path ya procesado, reutilizando")
+                            processed_url = seen_paths[it]
+                        elif (st := _regular_file_stat(it)) is not None:
                             self._log_info("📂 String es path local")
-                            processed_url = _path_to_data_uri(it)
+                            processed_url = await _path_to_data_uri_from_stat(it, st)
+                            seen_paths[it] = processed_url
                         else:
                             self._log_info("🌐 String es URL/URI")
                             processed_url = it
@@ -572,21 +722,32 @@ class Tools:
             self._log_info(f"🚀 Emitiendo {len(images_out)} imágenes")
             success_count = 0
 
-            for idx, url in enumerate(images_out):
-                self._log_info(
-                    f"--- 📤 Emitiendo imagen {idx + 1}/{len(images_out)} ---"
+            # markdown/html admiten varias imágenes por mensaje; direct es una por evento
+            if (
+                self.valves.BATCH_EMIT
+                and _emit_priority in ("markdown", "html")
+                and len(images_out) > 1
+                and await _emit_images_batch(
+                    images_out, payload.get("width"), payload.get("height")
                 )
+            ):
+                success_count = len(images_out)
+            else:
+                for idx, url in enumerate(images_out):
+                    self._log_info(
+                        f"--- 📤 Emitiendo imagen {idx + 1}/{len(images_out)} ---"
+                    )
 
-                success = await _emit_image(
-                    url,
-                    payload.get("width"),
-                    payload.get("height"),
-                    f"imagen_generada_{idx+1}",
-                    idx + 1,
-                )
+                    success = await _emit_image(
+                        url,
+                        payload.get("width"),
+                        payload.get("height"),
+                        f"imagen_generada_{idx+1}",
+                        idx + 1,
+                    )
 
-                if success:
-                    success_count += 1
+                    if success:
+                        success_count += 1
 
             # Status y resultado final
             final_message = f"✅ Generación completada: {success_count}/{len(images_out)} imágenes mostradas"
@@ -598,25 +759,23 @@ class Tools:
                 "images": images_out,
                 "images_emitted": success_count,
                 "total_processed": len(images_out),
-                "raw": (
-                    images
-                    if self.valves.VERBOSE_LOGGING
-                    else "Oculto - activa VERBOSE_LOGGING para ver"
-                ),
+                "raw": images if _verbose else "Oculto - activa VERBOSE_LOGGING para ver",
                 "method": "internal",
                 "valves_config": {
-                    "debug": self.valves.DEBUG_ENABLED,
-                    "verbose": self.valves.VERBOSE_LOGGING,
-                    "emit_method": self.valves.EMIT_METHOD_PRIORITY,
+                    "debug": _debug,
+                    "verbose": _verbose,
+                    "emit_method": _emit_priority,
+                    "batch_emit": self.valves.BATCH_EMIT,
                     "user_show_status": show_status,
                     "user_auto_alt": auto_alt_text,
                 },
             }
 
         except Exception as e:
-            internal_err = traceback.format_exc()
+            # format_exc recorre frames y lee fuentes: solo si se va a mostrar
+            internal_err = traceback.format_exc() if _debug else None
             self._log_error(f"💥 Error crítico: {str(e)}")
-            if self.valves.DEBUG_ENABLED:
+            if _debug:
                 self._log_error(f"Traceback:\n{internal_err}")
 
             await _emit_status(f"❌ Error: {str(e)}", True)
@@ -626,12 +785,12 @@ class Tools:
                 "error": f"Error interno: {str(e) if 'e' in locals() else 'Desconocido'}",
                 "internal_trace": (
                     internal_err
-                    if self.valves.DEBUG_ENABLED
+                    if _debug
                     else "Activa DEBUG_ENABLED en Valves para detalles"
                 ),
                 "valves_config": {
-                    "debug": self.valves.DEBUG_ENABLED,
-                    "verbose": self.valves.VERBOSE_LOGGING,
+                    "debug": _debug,
+                    "verbose": _verbose,
                 },
             }
 